@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def norm(x: np.ndarray) -> np.ndarray:
+    return np.sqrt((x**2).sum(axis=1))
+
+
+def happy_cat(x: np.ndarray) -> np.ndarray:
+    norm_sq = (x**2).sum(axis=1)
+    return ((norm_sq-4)**2)**(1/8) + (norm_sq / 2 + x.sum(axis=1))/4 + 1/2
+
+
+def griewank(x: np.ndarray) -> np.ndarray:
+    i = np.sqrt(np.arange(1, x.shape[1]+1))
+    return 1 + (x**2/4000).sum(axis=1) - np.cos(x / i).prod(axis=1)
+
+
+def salomon(x: np.ndarray) -> np.ndarray:
+    x_norm = norm(x)
+    return 1 - np.cos(2 * np.pi * x_norm) + 0.1 * x_norm
+
+
+def yang(x: np.ndarray, eps: np.ndarray) -> np.ndarray:
+    i = np.arange(1, x.shape[1]+1)
+    return (np.asarray(eps) * np.abs(x)**i).sum(axis=1)
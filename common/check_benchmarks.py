@@ -0,0 +1,53 @@
+# compares the batched benchmarks with the scalar versions the solvers used
+# to have, on random points of several dimensions:
+# python3 common/check_benchmarks.py
+from functools import reduce
+from math import cos, pi, sqrt
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common import benchmarks
+
+
+def norm(x):
+    return sqrt(sum(xi**2 for xi in x))
+
+
+def happy_cat(x):
+    return ((norm(x)**2-4)**2)**(1/8) + (norm(x)**2 / 2 + sum(x))/4 + 1/2
+
+
+def griewank(x):
+    return 1 + sum(xi**2/4000 for xi in x) - reduce(lambda a, b: a*b, (cos(xi / sqrt(i))
+                                                    for i, xi in enumerate(x, 1)))
+
+
+def salomon(x):
+    return 1 - cos(2 * pi * norm(x)) + 0.1 * norm(x)
+
+
+def yang(x, eps):
+    return sum(epsi * abs(xi)**i for i, (xi, epsi) in enumerate(zip(x, eps), 1))
+
+
+def check(name, points, values, scalar):
+    expected = np.array([scalar(x) for x in points.tolist()])
+    if not np.allclose(values, expected, rtol=1e-9, atol=1e-12):
+        raise AssertionError(f'{name}: batched and scalar results differ')
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    for dimension in (1, 2, 4, 10):
+        x = rng.uniform(-5, 5, (100, dimension))
+        eps = rng.uniform(0, 1, dimension)
+
+        check('happy_cat', x, benchmarks.happy_cat(x), happy_cat)
+        check('griewank', x, benchmarks.griewank(x), griewank)
+        check('salomon', x, benchmarks.salomon(x), salomon)
+        check('yang', x, benchmarks.yang(x, eps), lambda point: yang(point, eps.tolist()))
+
+    print('ok')
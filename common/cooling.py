@@ -0,0 +1,133 @@
+from abc import ABC, abstractmethod
+from math import log
+from statistics import median
+from time import time
+
+CALIBRATION_SAMPLES = 100
+# probability of accepting a typical uphill move at the initial temperature
+INIT_ACCEPTANCE = 0.8
+# temperature left at the end of the time budget, relative to the initial one
+FINAL_RATIO = 1e-4
+ADAPTIVE_WINDOW = 100
+ADAPTIVE_FACTOR = 0.9
+START_ACCEPTANCE = 0.5
+END_ACCEPTANCE = 0.01
+REHEAT_PATIENCE = 1000
+REHEAT_RATIO = 0.5
+
+
+def sample_deltas(s, tweak, quality, samples=CALIBRATION_SAMPLES):
+    quality_s = quality(s)
+    return [quality(tweak(s)) - quality_s for _ in range(samples)]
+
+
+def calibrate(s, tweak, quality, samples=CALIBRATION_SAMPLES, acceptance=INIT_ACCEPTANCE):
+    return initial_temperature(sample_deltas(s, tweak, quality, samples), acceptance)
+
+
+def initial_temperature(deltas, acceptance=INIT_ACCEPTANCE):
+    # temperature at which the median uphill move is accepted with the
+    # given probability; the median keeps infeasible moves from skewing it
+    uphill = [delta for delta in deltas if delta > 0]
+    if not uphill:
+        return 1.0
+    return -median(uphill) / log(acceptance)
+
+
+class Schedule(ABC):
+    # annealers read `t` and report every step with update(); proposals
+    # lets batched annealers report many chains at once
+    def __init__(self, t0, max_time):
+        self.t0 = t0
+        self.t = t0
+        self.max_time = max_time
+        self.start = time()
+
+    def elapsed(self):
+        # fraction of the time budget used so far
+        return min(1.0, (time() - self.start) / self.max_time) if self.max_time else 1.0
+
+    @abstractmethod
+    def update(self, accepted, proposals=1):
+        pass
+
+
+class Geometric(Schedule):
+    def __init__(self, t0, max_time, factor):
+        super().__init__(t0, max_time)
+        self.factor = factor
+
+    def update(self, accepted, proposals=1):
+        self.t *= self.factor
+
+
+class TimeProportional(Schedule):
+    # geometric in elapsed time rather than in iterations, so the whole
+    # budget is spent cooling from t0 to FINAL_RATIO * t0 on any machine
+    def __init__(self, t0, max_time, final_ratio=FINAL_RATIO):
+        super().__init__(t0, max_time)
+        self.final_ratio = final_ratio
+
+    def update(self, accepted, proposals=1):
+        self.t = self.t0 * self.final_ratio ** self.elapsed()
+
+
+class AdaptiveAcceptance(Schedule):
+    # every `window` proposals the temperature is nudged so that the
+    # acceptance rate follows a target falling over the time budget
+    def __init__(self, t0, max_time, start_rate=START_ACCEPTANCE,
+                 end_rate=END_ACCEPTANCE, window=ADAPTIVE_WINDOW, factor=ADAPTIVE_FACTOR):
+        super().__init__(t0, max_time)
+        self.start_rate = start_rate
+        self.end_rate = end_rate
+        self.window = window
+        self.factor = factor
+        self.accepted = 0
+        self.proposals = 0
+
+    def update(self, accepted, proposals=1):
+        self.accepted += accepted
+        self.proposals += proposals
+        if self.proposals < self.window:
+            return
+
+        target = self.start_rate + (self.end_rate - self.start_rate) * self.elapsed()
+        if self.accepted / self.proposals > target:
+            self.t *= self.factor
+        else:
+            self.t /= self.factor
+        self.accepted = 0
+        self.proposals = 0
+
+
+class Reheating(Geometric):
+    # geometric cooling that jumps back up after `patience` proposals in a
+    # row were rejected; every reheat peaks at `ratio` of the previous one
+    def __init__(self, t0, max_time, factor, patience=REHEAT_PATIENCE, ratio=REHEAT_RATIO):
+        super().__init__(t0, max_time, factor)
+        self.patience = patience
+        self.ratio = ratio
+        self.peak = t0
+        self.rejected = 0
+
+    def update(self, accepted, proposals=1):
+        super().update(accepted, proposals)
+        self.rejected = 0 if accepted else self.rejected + proposals
+        if self.rejected >= self.patience:
+            self.peak *= self.ratio
+            self.t = self.peak
+            self.rejected = 0
+
+
+def get_schedule(name, t0, max_time, factor, final_ratio=FINAL_RATIO):
+    # annealers pick one with a COOLING setting of 'geometric', 'time',
+    # 'adaptive' or 'reheating'; factor is only used by the geometric ones
+    if name == 'geometric':
+        return Geometric(t0, max_time, factor)
+    elif name == 'time':
+        return TimeProportional(t0, max_time, final_ratio)
+    elif name == 'adaptive':
+        return AdaptiveAcceptance(t0, max_time)
+    elif name == 'reheating':
+        return Reheating(t0, max_time, factor)
+    raise ValueError(f'unknown cooling schedule: {name}')
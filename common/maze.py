@@ -0,0 +1,350 @@
+from collections import OrderedDict, deque
+from enum import IntEnum
+from itertools import islice
+from sys import maxsize
+import sys
+
+import numpy as np
+
+from common.rope import Rope
+
+CHECKPOINT_STRIDE = 8
+FITNESS_CACHE_SIZE = 1 << 16
+
+
+# paths are bytearrays of direction codes
+class Direction(IntEnum):
+    UP = 0
+    RIGHT = 1
+    DOWN = 2
+    LEFT = 3
+
+
+# (x, y) move of each direction code
+OFFSETS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+DECODE_CELLS = bytes.maketrans(b'0123456789', bytes(range(10)))
+DECODE_MOVES = bytes.maketrans(b'URDL', bytes(Direction))
+ENCODE_MOVES = bytes.maketrans(bytes(Direction), b'URDL')
+
+
+def parse_path(line):
+    if isinstance(line, str):
+        line = line.encode()
+    return bytearray(line.strip().translate(DECODE_MOVES))
+
+
+def format_path(path):
+    return bytes(path).translate(ENCODE_MOVES).decode()
+
+
+def read_maze(stream=None):
+    # whole input in one read: the header numbers, the n maze rows as
+    # bytes of cell values (so maze_map[y][x] is an int) and the paths
+    # on the remaining lines
+    lines = (stream or sys.stdin.buffer).read().splitlines()
+    header = [int(word) for word in lines[0].split()]
+    n, m = header[1], header[2]
+
+    maze_map = [line[:m].translate(DECODE_CELLS) for line in lines[1:n+1]]
+    solutions = [parse_path(line) for line in lines[n+1:] if line.strip()]
+
+    return header, maze_map, solutions
+
+
+class Maze:
+    EMPTY = 0
+    AGENT = 5
+    WALL = 1
+    GOAL = 8
+    HORIZONTAL_TUNNEL = 3
+    VERTICAL_TUNNEL = 2
+
+    # transition target meaning the move walked into the goal
+    GOAL_CELL = -1
+
+    def __init__(self, maze_map, max_steps):
+        self.map = maze_map
+        self.start_pos = self.find_agent()
+        self.max_steps = max_steps
+        self.n = len(maze_map)
+        self.m = len(maze_map[0])
+        self.start = self.start_pos[1] * self.m + self.start_pos[0]
+        self.transitions = self.compile()
+        self._goal_distances = None
+        self._transition_array = None
+
+    def find_agent(self):
+        for i, _ in enumerate(self.map):
+            for j, el in enumerate(self.map[i]):
+                if el == self.AGENT:
+                    return (j, i)
+
+    def passable(self, x, y, direction):
+        # tunnels can only be entered and left along their axis
+        if not (0 <= x < self.m and 0 <= y < self.n):
+            return False
+
+        cell = self.map[y][x]
+        if cell == self.HORIZONTAL_TUNNEL:
+            return direction in (Direction.LEFT, Direction.RIGHT)
+        if cell == self.VERTICAL_TUNNEL:
+            return direction in (Direction.UP, Direction.DOWN)
+        return cell != self.WALL
+
+    def compile(self):
+        # flat table: transitions[4*cell + direction] is the cell the
+        # agent ends up in (cell = y*m + x), or GOAL_CELL
+        transitions = []
+        for y in range(self.n):
+            for x in range(self.m):
+                for direction in Direction:
+                    x_move, y_move = OFFSETS[direction]
+                    new_x, new_y = x + x_move, y + y_move
+
+                    if not self.passable(x, y, direction):
+                        transitions.append(y * self.m + x)
+                    elif 0 <= new_x < self.m and 0 <= new_y < self.n \
+                            and self.map[new_y][new_x] == self.GOAL:
+                        transitions.append(self.GOAL_CELL)
+                    elif not self.passable(new_x, new_y, direction):
+                        transitions.append(y * self.m + x)
+                    else:
+                        transitions.append(new_y * self.m + new_x)
+
+        return transitions
+
+    def goal_distances(self):
+        # fewest moves from every cell to the goal (maxsize if unreachable),
+        # by BFS from the goal over the reversed transition table
+        if self._goal_distances is None:
+            predecessors = [[] for _ in range(self.n * self.m)]
+            queue = deque()
+            distances = [maxsize] * (self.n * self.m)
+
+            for state, target in enumerate(self.transitions):
+                cell = state // 4
+                if target == self.GOAL_CELL:
+                    if distances[cell] == maxsize:
+                        distances[cell] = 1
+                        queue.append(cell)
+                elif target != cell:
+                    predecessors[target].append(cell)
+
+            while queue:
+                cell = queue.popleft()
+                for predecessor in predecessors[cell]:
+                    if distances[predecessor] == maxsize:
+                        distances[predecessor] = distances[cell] + 1
+                        queue.append(predecessor)
+
+            self._goal_distances = distances
+        return self._goal_distances
+
+    def shortest_distance(self):
+        # lower bound on eval_path of any path; reaching it proves optimality
+        return self.goal_distances()[self.start]
+
+    def shortest_path(self):
+        distances = self.goal_distances()
+        cell = self.start
+        if distances[cell] == maxsize:
+            return None
+
+        path = bytearray()
+        while cell != self.GOAL_CELL:
+            for direction in Direction:
+                target = self.transitions[4*cell + direction]
+                if target == self.GOAL_CELL and distances[cell] == 1 \
+                        or target >= 0 and distances[target] == distances[cell] - 1:
+                    path.append(direction)
+                    cell = target
+                    break
+
+        return path
+
+    def transition_array(self):
+        # transitions as a (cells + 1, 5) array: the goal is the extra,
+        # absorbing last row and code 4 is a padding move that stays put
+        if self._transition_array is None:
+            cells = self.n * self.m
+            table = np.empty((cells + 1, 5), dtype=np.int64)
+            table[:cells, :4] = np.array(self.transitions).reshape(cells, 4)
+            table[:cells, :4][table[:cells, :4] == self.GOAL_CELL] = cells
+            table[:, 4] = np.arange(cells + 1)
+            table[cells] = cells
+            self._transition_array = table
+        return self._transition_array
+
+    def eval_population(self, paths):
+        return eval_population(self.transition_array(), self.start, self.max_steps, paths)
+
+    def bounded_cost(self, path):
+        # eval_path, except that a path missing the goal costs one step past
+        # its length instead of maxsize, which keeps deltas of broken paths
+        # on the scale of the path (used to calibrate annealing temperatures)
+        return min(self.eval_path(path), len(path) + 1)
+
+    def eval_path(self, path):
+        transitions = self.transitions
+        cell = self.start
+
+        for cost, direction in enumerate(islice(path, self.max_steps), 1):
+            cell = transitions[4*cell + direction]
+            if cell < 0:
+                return cost
+
+        return maxsize
+
+
+def eval_population(table, start, max_steps, paths):
+    # eval_path of every path at once over a transition_array() table: the
+    # paths are padded into a (len(paths), length) code array and stepped
+    # together
+    length = min(max(map(len, paths), default=0), max_steps)
+    moves = np.full((len(paths), length), 4, dtype=np.uint8)
+    for row, path in zip(moves, paths):
+        path = path[:length]
+        row[:len(path)] = np.frombuffer(path, dtype=np.uint8)
+
+    goal = len(table) - 1
+    costs = np.full(len(paths), maxsize, dtype=np.int64)
+    alive = np.arange(len(paths))
+    cells = np.full(len(paths), start, dtype=np.int64)
+
+    for step in range(length):
+        cells = table[cells, moves[alive, step]]
+        reached = cells == goal
+        if reached.any():
+            costs[alive[reached]] = step + 1
+            alive = alive[~reached]
+            cells = cells[~reached]
+            if not len(alive):
+                break
+
+    return costs.tolist()
+
+
+class FitnessCache:
+    # least recently used path costs, keyed by a hash of the path bytes
+    def __init__(self, maxsize=FITNESS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.costs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.costs)
+
+    def __repr__(self):
+        return f'FitnessCache(size={len(self)}, hits={self.hits}, misses={self.misses})'
+
+    def key(self, path):
+        # ropes are not cached: hashing one reads out the whole path, which
+        # would undo its O(log L) edits
+        if isinstance(path, Rope):
+            return None
+        return hash(bytes(path))
+
+    def lookup(self, key):
+        cost = self.costs.get(key)
+        if cost is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.costs.move_to_end(key)
+        return cost
+
+    def store(self, key, cost):
+        self.costs[key] = cost
+        if len(self.costs) > self.maxsize:
+            self.costs.popitem(last=False)
+
+
+class PathEvaluator:
+    # cost of a path together with the cells it passes through every
+    # `stride` steps; a candidate that only differs from this path from
+    # some index on is simulated from the checkpoint before that index
+    def __init__(self, maze, path, cache=None, stride=CHECKPOINT_STRIDE,
+                 checkpoints=None, cost=None):
+        self.maze = maze
+        self.path = path
+        self.cache = cache
+        self.stride = stride
+        self._checkpoints = checkpoints
+
+        if cost is None:
+            self._checkpoints = []
+            cost = self.walk(path, 0, maze.start, self._checkpoints)
+            key = cache.key(path) if cache is not None else None
+            if key is not None:
+                cache.store(key, cost)
+        self.cost = cost
+        self.last = None
+
+    @property
+    def checkpoints(self):
+        # paths scored from the cache get their checkpoints on first use
+        if self._checkpoints is None:
+            self._checkpoints = []
+            self.walk(self.path, 0, self.maze.start, self._checkpoints)
+        return self._checkpoints
+
+    def walk(self, path, step, cell, checkpoints):
+        transitions = self.maze.transitions
+        end = min(len(path), self.maze.max_steps)
+
+        # a block at a time, ropes read lazily, so only the walked moves are read
+        rope = path.iter_from(step) if isinstance(path, Rope) else None
+        for block in range(step, end, self.stride):
+            checkpoints.append(cell)
+            stop = min(block + self.stride, end)
+            moves = islice(rope, stop - block) if rope is not None else path[block:stop]
+            for cost, direction in enumerate(moves, block + 1):
+                cell = transitions[4*cell + direction]
+                if cell < 0:
+                    return cost
+
+        return maxsize
+
+    def evaluate(self, candidate, index):
+        # candidate must equal self.path on [:index]
+        if self.cost <= index:
+            self.last = (candidate, None, None, self.cost)
+            return self.cost
+
+        key = self.cache.key(candidate) if self.cache is not None else None
+        if key is None:
+            return self.simulate(candidate, index)
+
+        cost = self.cache.lookup(key)
+        if cost is None:
+            cost = self.simulate(candidate, index)
+            self.cache.store(key, cost)
+        return cost
+
+    def simulate(self, candidate, index):
+        k = max(0, min(index // self.stride, len(self.checkpoints) - 1))
+        cell = self.checkpoints[k] if self.checkpoints else self.maze.start
+
+        checkpoints = []
+        cost = self.walk(candidate, k * self.stride, cell, checkpoints)
+        self.last = (candidate, k, checkpoints, cost)
+        return cost
+
+    def derive(self, candidate, index):
+        # evaluator for candidate, reusing the simulation evaluate() did for it
+        if self.last is None or self.last[0] is not candidate:
+            cost = self.evaluate(candidate, index)
+            if self.last is None or self.last[0] is not candidate:
+                return PathEvaluator(self.maze, candidate, self.cache,
+                                     self.stride, cost=cost)
+
+        _, k, checkpoints, cost = self.last
+        if k is None:
+            # same moves up to the goal, so the same checkpoints
+            checkpoints = self._checkpoints
+        else:
+            checkpoints = self.checkpoints[:k] + checkpoints
+        return PathEvaluator(self.maze, candidate, self.cache, self.stride,
+                             checkpoints, cost)
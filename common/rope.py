@@ -0,0 +1,190 @@
+from itertools import chain
+from random import random
+
+CHUNK_SIZE = 64
+
+
+class _Node:
+    # implicit treap node holding a run of path codes; `flipped` marks the
+    # whole subtree as reversed, which is only pushed down on a copy
+    __slots__ = ('left', 'right', 'priority', 'chunk', 'flipped', 'size', 'nodes')
+
+    def __init__(self, left, right, priority, chunk, flipped=False):
+        self.left = left
+        self.right = right
+        self.priority = priority
+        self.chunk = chunk
+        self.flipped = flipped
+        self.size = len(chunk)
+        self.nodes = 1
+        if left is not None:
+            self.size += left.size
+            self.nodes += left.nodes
+        if right is not None:
+            self.size += right.size
+            self.nodes += right.nodes
+
+
+def _flip(node):
+    if node is None:
+        return None
+    return _Node(node.left, node.right, node.priority, node.chunk, not node.flipped)
+
+
+def _push(node):
+    if not node.flipped:
+        return node
+    return _Node(_flip(node.right), _flip(node.left), node.priority, node.chunk[::-1])
+
+
+def _split(node, k):
+    # (first k codes, the rest); nodes are never modified, only copied
+    if node is None:
+        return None, None
+
+    node = _push(node)
+    left_size = node.left.size if node.left is not None else 0
+    if k <= left_size:
+        a, b = _split(node.left, k)
+        return a, _Node(b, node.right, node.priority, node.chunk)
+
+    k -= left_size
+    if k >= len(node.chunk):
+        a, b = _split(node.right, k - len(node.chunk))
+        return _Node(node.left, a, node.priority, node.chunk), b
+
+    return (_Node(node.left, None, node.priority, node.chunk[:k]),
+            _Node(None, node.right, node.priority, node.chunk[k:]))
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+
+    if a.priority > b.priority:
+        a = _push(a)
+        return _Node(a.left, _merge(a.right, b), a.priority, a.chunk)
+    b = _push(b)
+    return _Node(_merge(a, b.left), b.right, b.priority, b.chunk)
+
+
+def _build(data):
+    # balanced tree over CHUNK_SIZE runs; priorities are handed out in
+    # preorder from a descending sample, so every parent outranks its children
+    chunks = [bytes(data[start:start + CHUNK_SIZE]) for start in range(0, len(data), CHUNK_SIZE)]
+    priorities = iter(sorted((random() for _ in chunks), reverse=True))
+
+    def build(lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        priority = next(priorities)
+        left = build(lo, mid)
+        return _Node(left, build(mid + 1, hi), priority, chunks[mid])
+
+    return build(0, len(chunks))
+
+
+def _chunks(node, start=0):
+    # chunks of the codes from position start on: the descent to start
+    # stacks whatever follows it, then the stack is walked in order
+    stack = []
+    flipped = False
+    while node is not None:
+        flipped ^= node.flipped
+        first, second = (node.right, node.left) if flipped else (node.left, node.right)
+        chunk = node.chunk[::-1] if flipped else node.chunk
+        first_size = first.size if first is not None else 0
+
+        stack.append((second, flipped))
+        if start < first_size:
+            stack.append((chunk, flipped))
+            node = first
+        else:
+            start -= first_size
+            if start < len(chunk):
+                stack.append((chunk[start:], flipped))
+                break
+            start -= len(chunk)
+            node = second
+            stack.pop()
+
+    while stack:
+        item, flipped = stack.pop()
+        if item is None:
+            continue
+        if isinstance(item, bytes):
+            yield item
+            continue
+
+        flipped ^= item.flipped
+        if flipped:
+            stack.append((item.left, True))
+            stack.append((item.chunk[::-1], True))
+            stack.append((item.right, True))
+        else:
+            stack.append((item.right, False))
+            stack.append((item.chunk, False))
+            stack.append((item.left, False))
+
+
+class Rope:
+    # persistent path of direction codes: reverse() and replace() return a
+    # new rope in O(log L) and share everything else, so keeping an old
+    # rope around (e.g. the best path) costs nothing
+    def __init__(self, data=b'', root=None):
+        self.root = _build(data) if root is None else root
+
+    def __len__(self):
+        return self.root.size if self.root is not None else 0
+
+    def __bytes__(self):
+        return b''.join(_chunks(self.root))
+
+    def __iter__(self):
+        return iter(bytes(self))
+
+    def iter_from(self, start):
+        # codes from position start on, read out lazily chunk by chunk
+        return chain.from_iterable(_chunks(self.root, start))
+
+    def __repr__(self):
+        return f'Rope({bytes(self)!r})'
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return bytes(self)[index]
+            if start >= stop:
+                return b''
+            _, rest = _split(self.root, start)
+            middle, _ = _split(rest, stop - start)
+            return b''.join(_chunks(middle))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('rope index out of range')
+        return self[index:index + 1][0]
+
+    def derive(self, root):
+        # rebuild once the edits have shredded the chunks
+        if root is not None and root.nodes > 4 * (root.size // CHUNK_SIZE) + 64:
+            return Rope(b''.join(_chunks(root)))
+        return Rope(root=root)
+
+    def reverse(self, i, j):
+        # rope with the codes on [i:j] in reverse order
+        head, rest = _split(self.root, i)
+        middle, tail = _split(rest, j - i)
+        return self.derive(_merge(_merge(head, _flip(middle)), tail))
+
+    def replace(self, i, j, data):
+        # rope with the codes on [i:j] replaced by data
+        head, rest = _split(self.root, i)
+        _, tail = _split(rest, j - i)
+        middle = _Node(None, None, random(), bytes(data)) if data else None
+        return self.derive(_merge(_merge(head, middle), tail))
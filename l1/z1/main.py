@@ -3,12 +3,28 @@ from typing import Tuple, Callable
 from time import time
 from random import uniform
 from functools import reduce
+from multiprocessing import Pool, RawArray, RawValue, Lock
+from os import cpu_count
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common import benchmarks
 
 DELTA = 0.01
 NEIGHBOURS_COUNT = 8
+BATCH_NEIGHBOURS_COUNT = 256
+VECTORIZED = True
+PARALLEL = True
+WORKERS = cpu_count()
+PRUNE_PATIENCE = 1000
+DIMENSION = 4
 
 vector = Tuple[float, float, float, float]
 testfunc = Callable[[vector], float]
+batchfunc = Callable[[np.ndarray], np.ndarray]
 
 
 def prod(iterable):
@@ -28,8 +44,11 @@ def griewank(x: vector) -> float:
                                                   for i, xi in enumerate(x, 1))
 
 
+BATCH_FUNCS = {happy_cat: benchmarks.happy_cat, griewank: benchmarks.griewank}
+
+
 def new_point():
-    return tuple(uniform(-1, 1) for _ in range(4))
+    return tuple(uniform(-1, 1) for _ in range(DIMENSION))
 
 
 def tweak(x: vector, func: testfunc) -> vector:
@@ -38,24 +57,113 @@ def tweak(x: vector, func: testfunc) -> vector:
     return min(neighbours, key=func)
 
 
+def tweak_batch(x: np.ndarray, func: batchfunc):
+    neighbours = x + np.random.uniform(-DELTA, DELTA,
+                                       (BATCH_NEIGHBOURS_COUNT, len(x)))
+    scores = func(neighbours)
+    i = scores.argmin()
+    return neighbours[i], scores[i]
+
+
 def hill_climb(func: testfunc, max_time: int):
     s = new_point()
     best = s
+    quality_best = func(best)
     start_time = time()
     while time() - start_time < max_time:
         s = tweak(s, func)
         if s == best:
             s = new_point()
-        if func(s) < func(best):
+        quality_s = func(s)
+        if quality_s < quality_best:
             best = s
+            quality_best = quality_s
 
     return best
 
 
+def hill_climb_batch(func: testfunc, max_time: int):
+    batch_func = BATCH_FUNCS[func]
+    s = np.array(new_point())
+    best = s
+    quality_best = batch_func(best[np.newaxis])[0]
+    start_time = time()
+    while time() - start_time < max_time:
+        s, quality_s = tweak_batch(s, batch_func)
+        if np.array_equal(s, best):
+            s = np.array(new_point())
+            quality_s = batch_func(s[np.newaxis])[0]
+        if quality_s < quality_best:
+            best = s
+            quality_best = quality_s
+
+    return tuple(best.tolist())
+
+
+def init_worker(lock, quality, point):
+    global shared_lock, shared_quality, shared_point
+    shared_lock = lock
+    shared_quality = quality
+    shared_point = point
+
+
+def publish(s: np.ndarray, quality_s: float):
+    with shared_lock:
+        if quality_s < shared_quality.value:
+            shared_quality.value = quality_s
+            shared_point[:] = s
+
+
+def climb_worker(func: testfunc, deadline: float, seed: int):
+    np.random.seed(seed)
+    batch_func = BATCH_FUNCS[func]
+
+    s = np.random.uniform(-1, 1, DIMENSION)
+    quality_s = batch_func(s[np.newaxis])[0]
+    climb_best = quality_s
+    stale = 0
+    publish(s, quality_s)
+    while time() < deadline:
+        s, quality_s = tweak_batch(s, batch_func)
+        if quality_s < climb_best:
+            climb_best = quality_s
+            stale = 0
+            if quality_s < shared_quality.value:
+                publish(s, quality_s)
+        else:
+            stale += 1
+
+        # abandon climbs that stalled behind the incumbent of another worker
+        if stale > PRUNE_PATIENCE and climb_best > shared_quality.value:
+            s = np.random.uniform(-1, 1, DIMENSION)
+            quality_s = batch_func(s[np.newaxis])[0]
+            climb_best = quality_s
+            stale = 0
+
+
+def parallel_hill_climb(func: testfunc, max_time: int, workers: int = WORKERS):
+    lock = Lock()
+    quality = RawValue('d', float('inf'))
+    point = RawArray('d', DIMENSION)
+
+    deadline = time() + max_time
+    with Pool(workers, initializer=init_worker,
+              initargs=(lock, quality, point)) as pool:
+        pool.starmap(climb_worker, ((func, deadline, seed)
+                                    for seed in np.random.randint(2**32, size=workers)))
+
+    return tuple(point)
+
+
 if __name__ == "__main__":
     max_time, func_num = list(map(int, input().split()))
     func = happy_cat if func_num == 0 else griewank
 
-    result = hill_climb(func, max_time)
+    if PARALLEL:
+        result = parallel_hill_climb(func, max_time)
+    elif VECTORIZED:
+        result = hill_climb_batch(func, max_time)
+    else:
+        result = hill_climb(func, max_time)
 
     print(' '.join(str(xi) for xi in result), func(result))
@@ -1,70 +1,521 @@
 from time import time
-from sys import stderr
-from random import random
+from sys import stderr, stdin, argv
+from random import random, getrandbits
+from collections import Counter, deque
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count
+
+import numpy as np
+
+CANDIDATES_COUNT = 8
+OR_OPT_MAX_LEN = 3
+# 'swap' (all pairwise swaps) or 'two_opt' (2-opt and Or-opt moves
+# restricted to candidate lists)
+NEIGHBOURHOOD = 'two_opt'
+ROWS_CHUNK = 256
+WORKERS = cpu_count()
+PARALLEL_MIN_CITIES = 500
+
+TWO_OPT = 0
+OR_OPT = 1
+
+MASK_64 = (1 << 64) - 1
+ZOBRIST_SEED = getrandbits(64)
+
+
+def zobrist(position, city):
+    # splitmix64 of the (position, city) pair, stands in for a random
+    # n x n Zobrist table without storing it
+    z = (((position << 32) | city) ^ ZOBRIST_SEED) + 0x9E3779B97F4A7C15 & MASK_64
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK_64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK_64
+    return z ^ (z >> 31)
+
+
+def path_hash(path):
+    keys = zobrist(np.arange(len(path), dtype=np.uint64),
+                   np.asarray(path, dtype=np.uint64))
+    return int(np.bitwise_xor.reduce(keys))
+
+
+def swap_hash(h, path, i, j):
+    a, b = path[i], path[j]
+    return h ^ zobrist(i, a) ^ zobrist(j, b) ^ zobrist(i, b) ^ zobrist(j, a)
+
+
+class TabuMemory:
+    def __init__(self, tenure):
+        self.tenure = tenure
+        self.queue = deque()
+        self.counts = Counter()
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __len__(self):
+        return len(self.queue)
+
+    def snapshot(self):
+        return frozenset(self.counts)
+
+    def add(self, key):
+        self.queue.append(key)
+        self.counts[key] += 1
+
+        if len(self.queue) > self.tenure:
+            old = self.queue.popleft()
+            self.counts[old] -= 1
+            if not self.counts[old]:
+                del self.counts[old]
+
+
+def apply_swap(s, cost_s, hash_s, move):
+    if move is None:
+        return s, cost_s, hash_s
+
+    delta, i, j, hash_w = move
+    w = s.copy()
+    w[i], w[j] = w[j], w[i]
+    return w, cost_s + delta, hash_w
+
+
+class SwapScanPool:
+    # swap neighbourhood split by first position across worker processes;
+    # the matrix and the current tour sit in shared memory, each worker
+    # answers with its cheapest admissible swap and the tabu memory stays
+    # in the calling process
+    def __init__(self, cities, workers):
+        n = len(cities)
+        self.tour_memory = SharedMemory(create=True, size=8 * (n + 1))
+        self.tour = np.ndarray(n + 1, dtype=np.int64, buffer=self.tour_memory.buf)
+        self.cities_memory = None
+
+        if isinstance(cities, EuclideanCities):
+            spec = cities.points
+        else:
+            self.cities_memory = SharedMemory(create=True, size=max(1, cities.nbytes))
+            shared = np.ndarray(cities.shape, dtype=cities.dtype,
+                                buffer=self.cities_memory.buf)
+            shared[:] = cities
+            spec = (self.cities_memory.name, cities.shape, cities.dtype.str)
+
+        self.ranges = np.linspace(1, n - 1, workers * 4 + 1).astype(int)
+        self.pool = Pool(workers, initializer=init_scan_worker,
+                         initargs=(spec, self.tour_memory.name, n))
+
+    def step(self, s, cost_s, hash_s, cost_best, tabu):
+        self.tour[:] = s
+        snapshot = tabu.snapshot()
+        moves = self.pool.starmap(scan_swaps, (
+            (lo, hi, cost_s, hash_s, cost_best, snapshot)
+            for lo, hi in zip(self.ranges, self.ranges[1:]) if lo < hi))
+        moves = [move for move in moves if move is not None]
+        return apply_swap(s, cost_s, hash_s, min(moves, default=None))
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        for memory in (self.tour_memory, self.cities_memory):
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+
+
+def init_scan_worker(spec, tour_name, n):
+    global scan_tsp, scan_tour, scan_memory
+    if isinstance(spec, tuple):
+        name, shape, dtype = spec
+        cities_memory = SharedMemory(name=name)
+        cities = np.ndarray(shape, dtype=dtype, buffer=cities_memory.buf)
+    else:
+        cities_memory = None
+        cities = EuclideanCities(spec)
+
+    tour_memory = SharedMemory(name=tour_name)
+    scan_memory = (cities_memory, tour_memory)
+    scan_tsp = TSP(cities)
+    scan_tour = np.ndarray(n + 1, dtype=np.int64, buffer=tour_memory.buf)
+
+
+def scan_swaps(lo, hi, cost_s, hash_s, cost_best, tabu):
+    return scan_tsp.best_swap(scan_tour.tolist(), int(lo), int(hi),
+                              cost_s, hash_s, cost_best, tabu)
+
+
+class EuclideanCities:
+    # distance "matrix" of points in the plane, computed on demand; indexes
+    # like the dense array it replaces, with rounded Euclidean distances
+    dtype = np.dtype(np.int64)
+
+    def __init__(self, points):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.shape = (len(self.points), len(self.points))
+
+    def __len__(self):
+        return len(self.points)
+
+    def distances(self, a, b):
+        d = self.points[a] - self.points[b]
+        return np.rint(np.hypot(d[..., 0], d[..., 1])).astype(np.int64)
+
+    def distance(self, a, b):
+        return int(self.distances(a, b))
+
+    def __getitem__(self, key):
+        a, b = key if isinstance(key, tuple) else (key, slice(None))
+        if isinstance(a, (int, np.integer)) and isinstance(b, (int, np.integer)):
+            return self.distance(int(a), int(b))
+
+        index = np.arange(len(self.points))
+        if isinstance(a, slice):
+            a = index[a][:, np.newaxis]
+        if isinstance(b, slice):
+            b = index[b]
+        return self.distances(np.asarray(a), np.asarray(b))
+
+    def nearest(self, k):
+        # k nearest points of every point from a uniform grid of buckets
+        # holding about two points each, searched in growing rings
+        n = len(self.points)
+        k = min(k, n - 1)
+        low = self.points.min(axis=0)
+        side = max(1, int(np.sqrt(n / 2)))
+        size = (self.points.max(axis=0) - low) / side
+        size[size == 0] = 1
+
+        cell = np.minimum(((self.points - low) / size).astype(np.int64), side - 1)
+        cell_id = cell[:, 0] * side + cell[:, 1]
+        order = np.argsort(cell_id, kind='stable')
+        starts = np.searchsorted(cell_id[order], np.arange(side*side + 1))
+
+        nearest = np.empty((n, k), dtype=np.int64)
+        for c in np.unique(cell_id):
+            own = order[starts[c]:starts[c+1]]
+            x, y = divmod(int(c), side)
+            ring = 1
+            while True:
+                x0, x1 = max(0, x - ring), min(side - 1, x + ring)
+                y0, y1 = max(0, y - ring), min(side - 1, y + ring)
+                candidates = np.concatenate([order[starts[i*side + y0]:starts[i*side + y1 + 1]]
+                                             for i in range(x0, x1 + 1)])
+                whole_grid = x0 == 0 and y0 == 0 and x1 == side - 1 and y1 == side - 1
+                if len(candidates) > k:
+                    d = self.points[own, np.newaxis] - self.points[candidates]
+                    d = np.hypot(d[..., 0], d[..., 1])
+                    d[own[:, np.newaxis] == candidates] = np.inf
+                    closest = np.argpartition(d, k-1, axis=1)[:, :k]
+                    d = np.take_along_axis(d, closest, 1)
+                    # anything outside the searched rings is at least
+                    # ring cells away from every point of this cell
+                    if whole_grid or d.max() <= ring * size.min():
+                        closest = np.take_along_axis(closest, d.argsort(axis=1), 1)
+                        nearest[own] = candidates[closest]
+                        break
+                ring += 1
+
+        return nearest
 
 
 class TSP:
     MAX_TABU_LEN = 64
 
     def __init__(self, cities):
+        if not isinstance(cities, EuclideanCities):
+            cities = np.ascontiguousarray(cities)
         self.cities = cities
-        self.cities_count = len(cities)
+        self.cities_count = len(self.cities)
+        self._neighbours = None
+
+    @property
+    def neighbours(self):
+        # k nearest cities by outgoing distance, computed on first use
+        if self._neighbours is None:
+            n = self.cities_count
+            k = min(CANDIDATES_COUNT, n - 1)
+            if isinstance(self.cities, EuclideanCities):
+                self._neighbours = self.cities.nearest(k)
+                return self._neighbours
+
+            chunks = []
+            for lo in range(0, n, ROWS_CHUNK):
+                rows = self.cities[lo:lo+ROWS_CHUNK].astype(np.float64)
+                rows[np.arange(len(rows)), np.arange(lo, lo+len(rows))] = np.inf
+                nearest = np.argpartition(rows, k-1, axis=1)[:, :k]
+                order = np.take_along_axis(rows, nearest, 1).argsort(axis=1)
+                chunks.append(np.take_along_axis(nearest, order, 1))
+            self._neighbours = np.concatenate(chunks)
+        return self._neighbours
 
     def evaluate(self, path):
-        cost = 0
-        last_city = path[0]
-        for city in path[1:]:
-            cost += cities[last_city][city]
-            last_city = city
-        return cost
-
-    def greedy_solution(self):
-        visited = [0]
+        return int(self.cities[path[:-1], path[1:]].sum())
+
+    def greedy_solution(self, deadline=None):
+        # nearest neighbour tour; past the deadline the unvisited cities
+        # are appended in index order
+        far = np.iinfo(self.cities.dtype).max
+        visited = np.zeros(self.cities_count, dtype=bool)
+        visited[0] = True
+        solution = [0]
         i = 0
-        while len(visited) != self.cities_count:
-            i, _ = min((city for city in enumerate(
-                self.cities[i]) if city[0] not in visited), key=lambda x: x[1])
-            visited.append(i)
+        for _ in range(self.cities_count - 1):
+            if deadline is not None and time() > deadline:
+                solution.extend(np.flatnonzero(~visited).tolist())
+                break
+            i = int(np.where(visited, far, self.cities[i]).argmin())
+            visited[i] = True
+            solution.append(i)
 
-        solution = visited + [0]
+        solution.append(0)
         return solution, self.evaluate(solution)
 
-    def tabu_search(self, max_time):
-        # s = [0] + shuffled(list(range(1, self.cities_count))) + [0]
-        s, _ = self.greedy_solution()
-        best = s
-        tabu_list = []
-        tabu_list.append(s)
+    def swap_deltas(self, path, lo, hi):
+        # cost change of swapping path[i] and path[j] for every i in
+        # [lo, hi) and every inner j, as a (hi - lo) x (n - 1) matrix;
+        # pairs with j <= i are masked with the largest integer
+        c = self.cities
+        s = np.asarray(path)
+        before, city, after = s[:-2], s[1:-1], s[2:]
+        rows = np.arange(lo, hi) - 1
+
+        removed = c[before, city].astype(np.int64) + c[city, after]
+        delta = c[np.ix_(before[rows], city)] + c[np.ix_(before, city[rows])].T \
+            + c[np.ix_(city[rows], after)] + c[np.ix_(city, after[rows])].T \
+            - removed[rows, np.newaxis] - removed
+
+        # adjacent swaps share an edge, so score them separately
+        adjacent = rows[rows + 1 < len(city)]
+        a, b = city[adjacent], city[adjacent+1]
+        delta[adjacent - rows[0], adjacent + 1] = \
+            c[before[adjacent], b].astype(np.int64) + c[b, a] + c[a, after[adjacent+1]] \
+            - c[before[adjacent], a] - c[a, b] - c[b, after[adjacent+1]]
+
+        delta[np.arange(len(rows))[:, np.newaxis] >= np.arange(len(city)) - rows[0]] = \
+            np.iinfo(np.int64).max
+        return delta
+
+    def prefix_costs(self, path):
+        # running cost of the tour walked forwards and backwards, so the
+        # cost of reversing any segment is a difference of two entries
+        s = np.asarray(path)
+        forward = np.zeros(len(s), dtype=np.int64)
+        backward = np.zeros(len(s), dtype=np.int64)
+        np.cumsum(self.cities[s[:-1], s[1:]], out=forward[1:])
+        np.cumsum(self.cities[s[1:], s[:-1]], out=backward[1:])
+        return forward, backward
+
+    def positions(self, path):
+        position = np.empty(self.cities_count, dtype=np.int64)
+        position[path[:-1]] = np.arange(self.cities_count)
+        return position
+
+    def candidate_moves(self, path, position, forward, backward, anchors):
+        # 2-opt and Or-opt moves that create an edge leaving an anchor city
+        # towards one of its candidate neighbours, as parallel arrays
+        # (delta, kind, i, j, k)
+        c = self.cities
+        n = self.cities_count
+        s = np.asarray(path)
+
+        a = np.repeat(anchors, self.neighbours.shape[1])
+        b = self.neighbours[anchors].ravel()
+        p = position[a]
+        q = position[b]
+        q_end = np.where(b == 0, n, q)
+        link = c[a, b].astype(np.int64)
+        moves = []
+
+        # reverse path[p+1..q], new edges (a, b) and (path[p+1], path[q+1])
+        valid = (b != 0) & (q > p + 1)
+        i, j = p[valid] + 1, q[valid]
+        moves.append((link[valid] + c[s[i], s[j+1]] - c[a[valid], s[i]]
+                      - c[b[valid], s[j+1]]
+                      + backward[j] - backward[i] - forward[j] + forward[i],
+                      TWO_OPT, i, j, 0))
+
+        # reverse path[p..q-1], new edges (path[p-1], path[q-1]) and (a, b)
+        valid = (p > 0) & (q_end > p + 1)
+        i, j = p[valid], q_end[valid] - 1
+        moves.append((link[valid] + c[s[i-1], s[j]] - c[s[i-1], a[valid]]
+                      - c[s[j], b[valid]]
+                      + backward[j] - backward[i] - forward[j] + forward[i],
+                      TWO_OPT, i, j, 0))
+
+        # move path[i..p], which ends with a, in front of b
+        for length in range(1, OR_OPT_MAX_LEN + 1):
+            i = p - length + 1
+            valid = (i >= 1) & ((q_end < i) | (q_end > p + 1))
+            i, j, k = i[valid], p[valid], q_end[valid]
+            x, before, after = s[i], s[i-1], s[j+1]
+            moves.append((link[valid] + c[before, after] + c[s[k-1], x]
+                          - c[before, x] - c[a[valid], after] - c[s[k-1], b[valid]],
+                          OR_OPT, i, j, k))
+
+        return [np.concatenate([np.broadcast_to(move[field], move[0].shape)
+                                for move in moves]) for field in range(5)]
+
+    def apply_move(self, path, kind, i, j, k):
+        if kind == TWO_OPT:
+            return path[:i] + path[j:i-1:-1] + path[j+1:]
+        if k < i:
+            return path[:k] + path[i:j+1] + path[k:i] + path[j+1:]
+        return path[:i] + path[j+1:k] + path[i:j+1] + path[k:]
+
+    def move_endpoints(self, path, kind, i, j, k):
+        if kind == TWO_OPT:
+            return path[i-1], path[i], path[j], path[j+1]
+        return path[i-1], path[i], path[j], path[j+1], path[k-1], path[k]
+
+    def local_search(self, path, cost, deadline):
+        # descent over candidate moves with don't-look bits, cut off at the
+        # deadline
+        position = self.positions(path)
+        forward, backward = self.prefix_costs(path)
+        dont_look = [False] * self.cities_count
+        active = deque(path[:-1])
 
+        while active and time() < deadline:
+            a = active.popleft()
+            if dont_look[a]:
+                continue
+
+            delta, *move = self.candidate_moves(path, position, forward,
+                                                backward, [a])
+            if not len(delta) or delta.min() >= 0:
+                dont_look[a] = True
+                continue
+
+            best = delta.argmin()
+            move = [int(field[best]) for field in move]
+            for city in self.move_endpoints(path, *move):
+                dont_look[city] = False
+                active.append(city)
+
+            path = self.apply_move(path, *move)
+            cost += int(delta[best])
+            position = self.positions(path)
+            forward, backward = self.prefix_costs(path)
+
+        return path, cost
+
+    def best_swap(self, s, lo, hi, cost_s, hash_s, cost_best, tabu):
+        # cheapest admissible swap with the first position in [lo, hi), as
+        # (delta, i, j, hash) or None; only the len(tabu) + 1 cheapest swaps
+        # can be needed: distinct swaps give distinct tours, so at least one
+        # of them is not tabu
+        inner = self.cities_count - 1
+        count = len(tabu) + 1
+        deltas, rows, columns = [], [], []
+        for chunk in range(lo, hi, ROWS_CHUNK):
+            delta = self.swap_deltas(s, chunk, min(chunk + ROWS_CHUNK, hi))
+            cheapest = np.argpartition(delta, count-1, axis=None)[:count] \
+                if delta.size > count else np.arange(delta.size)
+            deltas.append(delta.ravel()[cheapest])
+            rows.append(cheapest // inner + chunk)
+            columns.append(cheapest % inner + 1)
+        if not deltas:
+            return None
+        deltas, rows, columns = map(np.concatenate, (deltas, rows, columns))
+
+        for m in np.argsort(deltas, kind='stable'):
+            delta, i, j = int(deltas[m]), int(rows[m]), int(columns[m])
+            if j <= i:
+                break
+            hash_w = swap_hash(hash_s, s, i, j)
+            # aspiration: a tabu move is allowed if it beats the best tour
+            if hash_w not in tabu or cost_s + delta < cost_best:
+                return delta, i, j, hash_w
+
+        return None
+
+    def swap_step(self, s, cost_s, hash_s, cost_best, tabu):
+        move = self.best_swap(s, 1, self.cities_count - 1,
+                              cost_s, hash_s, cost_best, tabu)
+        return apply_swap(s, cost_s, hash_s, move)
+
+    def two_opt_step(self, s, cost_s, hash_s, cost_best, tabu):
+        position = self.positions(s)
+        forward, backward = self.prefix_costs(s)
+        deltas, *moves = self.candidate_moves(s, position, forward, backward,
+                                              np.arange(self.cities_count))
+
+        for m in np.argsort(deltas, kind='stable'):
+            delta = int(deltas[m])
+            w = self.apply_move(s, *(int(field[m]) for field in moves))
+            hash_w = path_hash(w)
+            if hash_w not in tabu or cost_s + delta < cost_best:
+                return w, cost_s + delta, hash_w
+
+        return s, cost_s, hash_s
+
+    def tabu_search(self, max_time, tenure=MAX_TABU_LEN,
+                    neighbourhood=NEIGHBOURHOOD, workers=WORKERS):
+        # the budget covers construction and descent as well
         start = time()
-        while time() - start < max_time:
-            if len(tabu_list) > self.MAX_TABU_LEN:
-                tabu_list.pop(0)
 
-            r = s
-            for i in range(1, self.cities_count-1):
-                for j in range(1, self.cities_count-1):
-                    if j == i:
-                        continue
-                    w = s.copy()
-                    w[i], w[j] = w[j], w[i]
-                    if w not in tabu_list and (self.evaluate(w) < self.evaluate(r) or r in tabu_list):
-                        r = w
+        # s = [0] + shuffled(list(range(1, self.cities_count))) + [0]
+        s, cost_s = self.greedy_solution(start + max_time)
+        scan_pool = None
+        if neighbourhood == 'two_opt':
+            s, cost_s = self.local_search(s, cost_s, start + max_time)
+            step = self.two_opt_step
+        elif workers > 1 and self.cities_count >= PARALLEL_MIN_CITIES:
+            scan_pool = SwapScanPool(self.cities, workers)
+            step = scan_pool.step
+        else:
+            step = self.swap_step
+
+        best, cost_best = s, cost_s
+        hash_s = path_hash(s)
+        tabu = TabuMemory(tenure)
+        tabu.add(hash_s)
+
+        try:
+            while time() - start < max_time:
+                s, new_cost, new_hash = step(s, cost_s, hash_s, cost_best, tabu)
+                if new_hash != hash_s:
+                    cost_s, hash_s = new_cost, new_hash
+                    tabu.add(hash_s)
+
+                if cost_s < cost_best:
+                    best, cost_best = s, cost_s
+        finally:
+            if scan_pool is not None:
+                scan_pool.close()
+
+        return best, cost_best
+
+
+def read_cities(stream, cities_count):
+    # whole text matrix parsed in one pass instead of row by row
+    cities = np.fromstring(stream.read(), dtype=np.int64, sep=' ')
+    return cities[:cities_count*cities_count].reshape(cities_count, cities_count)
+
 
-            if r not in tabu_list:
-                s = r
-                tabu_list.append(s)
-            if self.evaluate(s) < self.evaluate(best):
-                best = s
+def load_cities(path, cities_count):
+    # memory-mapped, so solvers working on the same file share the page cache;
+    # an .npy file of n (x, y) rows is taken as a coordinate instance
+    if path.endswith('.npy'):
+        cities = np.load(path, mmap_mode='r')
+        if cities.shape == (cities_count, 2) and cities_count != 2:
+            return EuclideanCities(cities)
+    else:
+        cities = np.memmap(path, dtype=np.int32, mode='r',
+                           shape=(cities_count, cities_count))
 
-        return best, self.evaluate(best)
+    if cities.shape != (cities_count, cities_count):
+        raise ValueError(f'{path}: expected a {cities_count}x{cities_count} '
+                         f'matrix, got shape {cities.shape}')
+    return cities
 
 
 if __name__ == "__main__":
-    first_line = input()
+    first_line = stdin.buffer.readline()
     max_time, cities_count = [int(num) for num in first_line.split()]
-    cities = [[int(num) for num in input().split()]
-              for _ in range(cities_count)]
+    if len(argv) > 1:
+        cities = load_cities(argv[1], cities_count)
+    else:
+        cities = read_cities(stdin.buffer, cities_count)
 
     tsp = TSP(cities)
     best_path, cost = tsp.tabu_search(max_time)
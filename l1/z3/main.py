@@ -1,59 +1,20 @@
-from enum import Enum
-from typing import List
-from sys import maxsize
 from random import random, randrange
 from time import time
 from sys import stderr
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.maze import (Direction, Maze as MazeEngine, FitnessCache,
+                         PathEvaluator, OFFSETS, format_path, read_maze)
 
 MAX_TABU_LEN = 64
 NEIGHBOUR_SWAPS = 16
+# report fitness cache hits and misses on stderr, ahead of the path
+CACHE_STATS = False
 
 
-class Direction(Enum):
-    UP = (0, -1)
-    RIGHT = (1, 0)
-    DOWN = (0, 1)
-    LEFT = (-1, 0)
-
-
-class Maze:
-    EMPTY = 0
-    AGENT = 5
-    WALL = 1
-    GOAL = 8
-
-    def __init__(self, maze_map, max_steps):
-        self.map = maze_map
-        self.start_pos = self.find_agent()
-        self.max_steps = max_steps
-
-    def find_agent(self):
-        for i, _ in enumerate(self.map):
-            for j, el in enumerate(self.map[i]):
-                if el == self.AGENT:
-                    return (j, i)
-
-    def eval_path(self, path: List[Direction]):
-        cost = 0
-        x_pos, y_pos = self.start_pos
-
-        for direction in path:
-            cost += 1
-            if cost > self.max_steps:
-                return maxsize
-
-            x_move, y_move = direction.value
-            new_x = x_pos + x_move
-            new_y = y_pos + y_move
-
-            if self.map[new_y][new_x] == self.GOAL:
-                return cost
-
-            if self.map[new_y][new_x] != self.WALL:
-                x_pos, y_pos = new_x, new_y
-
-        return maxsize
-
+class Maze(MazeEngine):
     def get_move_to_goal(self, x, y):
         if self.map[y+1][x] == self.GOAL:
             return Direction.DOWN
@@ -67,7 +28,7 @@ class Maze:
             return None
 
     def generate_naive_path(self):
-        moves = []
+        moves = bytearray()
         x_pos, y_pos = self.start_pos
         new_x, new_y = x_pos, y_pos
 
@@ -75,11 +36,11 @@ class Maze:
         cur_direction = 0
         while self.map[y_pos][x_pos] != self.GOAL:
             move_to_goal = self.get_move_to_goal(x_pos, y_pos)
-            if move_to_goal:
+            if move_to_goal is not None:
                 moves.append(move_to_goal)
                 break
 
-            x_move, y_move = directions[cur_direction].value
+            x_move, y_move = OFFSETS[cur_direction]
             new_x = x_pos + x_move
             new_y = y_pos + y_move
 
@@ -94,44 +55,51 @@ class Maze:
 
 def tabu_search(maze: Maze, max_time):
     s = maze.generate_naive_path()
+    cache = FitnessCache()
+    evaluator = PathEvaluator(maze, s, cache)
     best = s
+    quality_best = evaluator.cost
     tabu_list = []
     tabu_list.append(s)
+    bound = maze.shortest_distance()
 
     start = time()
-    while time() - start < max_time:
+    while time() - start < max_time and quality_best > bound:
         if len(tabu_list) > MAX_TABU_LEN:
             tabu_list.pop(0)
 
-        r = s
+        r, quality_r, index_r = s, evaluator.cost, 0
         for _ in range(NEIGHBOUR_SWAPS):
             w = s.copy()
             i = randrange(len(s))
             j = randrange(len(s))
             w[i], w[j] = w[j], w[i]
-            if w not in tabu_list and (maze.eval_path(w) < maze.eval_path(r) or r in tabu_list):
-                r = w
+            if w in tabu_list:
+                continue
+
+            quality_w = evaluator.evaluate(w, min(i, j))
+            if quality_w < quality_r or r in tabu_list:
+                r, quality_r, index_r = w, quality_w, min(i, j)
 
         if r not in tabu_list:
             s = r
+            evaluator = evaluator.derive(r, index_r)
             tabu_list.append(s)
-        if maze.eval_path(s) < maze.eval_path(best):
+        if evaluator.cost < quality_best:
             best = s
+            quality_best = evaluator.cost
 
+    if CACHE_STATS:
+        print(cache, file=stderr)
     return best
 
 
 if __name__ == "__main__":
-    max_time, n, m = [int(word) for word in input().split()]
-
-    maze_map = [[int(char) for char in input()[:m]] for _ in range(n)]
+    (max_time, n, m), maze_map, _ = read_maze()
 
     maze = Maze(maze_map, n*m)
 
     best = tabu_search(maze, max_time)
 
-    move_names = {Direction.UP: 'U', Direction.DOWN: 'D',
-                  Direction.RIGHT: 'R', Direction.LEFT: 'L'}
-
     print(maze.eval_path(best))
-    print(''.join(move_names[move] for move in best), file=stderr)
+    print(format_path(best), file=stderr)
@@ -1,9 +1,25 @@
 from math import cos, pi, sqrt, exp
 from time import time
 from random import random, gauss
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common import benchmarks
+from common.cooling import calibrate, get_schedule
 
 INIT_TEMP = 10**10
 DECREASE_FACTOR = 0.99
+COOLING = 'time'
+CALIBRATE = True
+# salomon's rings are far higher than a typical move delta, so the chains
+# start accepting nearly every uphill move and cool all the way down
+INIT_ACCEPTANCE = 0.999
+FINAL_RATIO = 1e-8
+VECTORIZED = True
+CHAINS = 256
 
 
 def salomon(x):
@@ -16,23 +32,26 @@ def tweak(x):
 
 
 def simulated_annealing(init_solution, max_time, tweak, quality):
-    t = INIT_TEMP
+    t = calibrate(init_solution, tweak, quality, acceptance=INIT_ACCEPTANCE) if CALIBRATE else INIT_TEMP
+    schedule = get_schedule(COOLING, t, max_time, DECREASE_FACTOR, FINAL_RATIO)
 
     s = init_solution
     best = s
     quality_best = quality(best)
 
+    quality_s = quality_best
+
     start = time()
     while time() - start < max_time:
         r = tweak(s)
-        quality_s = quality(s)
         quality_r = quality(r)
 
-        if quality_r < quality_s or random() < exp((quality_s - quality_r) / t):
+        accepted = quality_r < quality_s or random() < exp((quality_s - quality_r) / schedule.t)
+        if accepted:
             s = r
             quality_s = quality_r
 
-        t *= DECREASE_FACTOR
+        schedule.update(accepted)
 
         if quality_s < quality_best:
             if abs(quality_s - quality_best)/quality_best < 0.000000001:
@@ -44,9 +63,45 @@ def simulated_annealing(init_solution, max_time, tweak, quality):
     return best
 
 
+def simulated_annealing_batch(init_solution, max_time, chains=CHAINS):
+    # independent chains from the same start, stepped together as rows
+    t = calibrate(init_solution, tweak, salomon, acceptance=INIT_ACCEPTANCE) if CALIBRATE else INIT_TEMP
+    schedule = get_schedule(COOLING, t, max_time, DECREASE_FACTOR, FINAL_RATIO)
+
+    s = np.tile(np.asarray(init_solution, dtype=float), (chains, 1))
+    quality_s = benchmarks.salomon(s)
+    best = s[0].copy()
+    quality_best = quality_s[0]
+
+    start = time()
+    while time() - start < max_time:
+        r = s * np.random.normal(1, 0.1, s.shape)
+        quality_r = benchmarks.salomon(r)
+
+        with np.errstate(all='ignore'):
+            accepted = (quality_r < quality_s) | \
+                (np.random.random(chains) < np.exp((quality_s - quality_r) / schedule.t))
+        s[accepted] = r[accepted]
+        quality_s[accepted] = quality_r[accepted]
+
+        schedule.update(accepted.sum(), chains)
+
+        i = quality_s.argmin()
+        if quality_s[i] < quality_best:
+            if abs(quality_s[i] - quality_best)/quality_best < 0.000000001:
+                return best.tolist()
+            best = s[i].copy()
+            quality_best = quality_s[i]
+
+    return best.tolist()
+
+
 def main():
     time, *x = list(map(float, input().split()))
-    best = simulated_annealing(x, time, tweak, salomon)
+    if VECTORIZED:
+        best = simulated_annealing_batch(x, time)
+    else:
+        best = simulated_annealing(x, time, tweak, salomon)
     print(*best, salomon(best))
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+# compares the incrementally kept error of block matrices with the error
+# of their rendered pixels, over random moves on random images:
+# python3 check_error.py
+from pathlib import Path
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from main import BlockMatrix, ErrorTable, VALUES, change_value, merge_and_split
+
+MOVES = 200
+
+
+def matrix_distance(matrix, block_matrix, n, m):
+    return float(((np.asarray(matrix) - block_matrix.values())**2).sum()) / (n * m)
+
+
+def check(matrix, block_matrix, n, m):
+    expected = matrix_distance(matrix, block_matrix, n, m)
+    if not np.isclose(block_matrix.error / (n * m), expected, rtol=1e-12):
+        raise AssertionError(f'{n}x{m}: kept error {block_matrix.error / (n * m)}, '
+                             f'rendered error {expected}')
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    for n, m, k in ((8, 8, 2), (12, 7, 3), (10, 10, 5), (2, 12, 3), (5, 5, 6)):
+        matrix = rng.choice(VALUES, (n, m))
+        s = BlockMatrix.get_initialized(n, m, k, ErrorTable(matrix))
+        check(matrix, s, n, m)
+        for _ in range(MOVES if s.blocks else 0):
+            s = random.choice((change_value, merge_and_split))(s, k)
+            check(matrix, s, n, m)
+
+    print('ok')
@@ -1,13 +1,22 @@
 from math import exp
 from time import time
 import random
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from sys import stderr
-from copy import deepcopy
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.cooling import calibrate, get_schedule
 
 
 INIT_TEMP = 1000000
 DECREASE_FACTOR = 0.99
+COOLING = 'time'
+CALIBRATE = True
+CALIBRATION_SAMPLES = 10
 
 VALUES = [0, 32, 64, 128, 160, 192, 223, 255]
 
@@ -21,50 +30,136 @@ class Block:
     value: int
 
 
+class ErrorTable:
+    # summed-area tables of the target and of its square, so the squared
+    # error of a block filled with one value is a handful of lookups:
+    # sum((x - v)^2) = sum(x^2) - 2 v sum(x) + v^2 area
+    def __init__(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.int64)
+        n, m = matrix.shape
+
+        sums = np.zeros((n+1, m+1), dtype=np.int64)
+        sums[1:, 1:] = matrix.cumsum(axis=0).cumsum(axis=1)
+        squares = np.zeros((n+1, m+1), dtype=np.int64)
+        squares[1:, 1:] = (matrix**2).cumsum(axis=0).cumsum(axis=1)
+
+        self.sums = sums.tolist()
+        self.squares = squares.tolist()
+        # pixels no block covers count as -1
+        self.uncovered_error = self.block_error(Block(0, 0, m, n, -1))
+
+    def block_error(self, block, value=None):
+        if value is None:
+            value = block.value
+        top, left = block.start_row, block.start_column
+        bottom, right = top + block.height, left + block.width
+
+        sums, squares = self.sums, self.squares
+        total = sums[bottom][right] - sums[top][right] - sums[bottom][left] + sums[top][left]
+        total_sq = squares[bottom][right] - squares[top][right] \
+            - squares[bottom][left] + squares[top][left]
+        return total_sq - 2*value*total + value*value*block.width*block.height
+
+    def cover_error(self, block):
+        # change in the total error when block covers its uncovered pixels
+        return self.block_error(block) - self.block_error(block, -1)
+
+
 class BlockMatrix:
-    def __init__(self, blocks, n, m):
+    # labels[i, j] is the index in `blocks` of the block covering pixel
+    # (i, j), or -1; every matrix owns its labels or shares them unchanged.
+    # With an ErrorTable, `error` is the total squared error against its
+    # target, kept up to date from the blocks each move touches
+    def __init__(self, blocks, n, m, labels=None, table=None, error=None):
         self.blocks = blocks
         self.n = n
         self.m = m
+        self.table = table
+
+        if labels is None:
+            labels = np.full((n, m), -1, dtype=np.int32)
+            for index, block in enumerate(blocks):
+                paint(labels, block, index)
+        self.labels = labels
+
+        if table is not None and error is None:
+            error = table.uncovered_error + sum(map(table.cover_error, blocks))
+        self.error = error
 
     @classmethod
-    def get_initialized(cls, n, m, k):
-        new = cls([], n, m)
+    def get_initialized(cls, n, m, k, table=None):
+        blocks = []
 
         for i in range(0, n-k+1, k):
             block_height = n - i if i + 2*k > n else k
             for j in range(0, m-k+1, k):
                 block_width = m - j if j + 2*k > m else k
 
-                new.blocks.append(
+                blocks.append(
                     Block(i, j, block_width, block_height, random.choice(VALUES)))
 
-        return new
-
-    def __getitem__(self, key):
-        row, column = key
-
-        for block in self.blocks:
-            if block.start_row <= row and block.start_column <= column \
-                    and block.start_row + block.height > row and block.start_column + block.width > column:
-                return block.value
-
-        return -1
-
-    def copy(self):
-        return BlockMatrix(deepcopy(self.blocks), self.n, self.m)
+        return cls(blocks, n, m, table=table)
+
+    def values(self):
+        # value of every pixel, -1 where no block covers it
+        return np.array([block.value for block in self.blocks] + [-1])[self.labels]
+
+    def delta(self, removed, added):
+        # error after replacing the `removed` blocks by the `added` ones
+        if self.table is None:
+            return None
+        return self.error - sum(map(self.table.cover_error, removed)) \
+            + sum(map(self.table.cover_error, added))
+
+    def changed(self, i, value):
+        # copy with block i filled with value; the layout is unchanged
+        blocks = self.blocks.copy()
+        blocks[i] = replace(blocks[i], value=value)
+        return BlockMatrix(blocks, self.n, self.m, self.labels, self.table,
+                           self.delta([self.blocks[i]], [blocks[i]]))
+
+    def merged(self, i, j, block):
+        # copy with blocks i and j replaced by block; the last block takes
+        # j's place, so only the pixels of the blocks involved are relabelled
+        error = self.delta([self.blocks[i], self.blocks[j]], [block])
+        blocks = self.blocks.copy()
+        labels = self.labels.copy()
+
+        last = len(blocks) - 1
+        blocks[j] = blocks[last]
+        blocks.pop()
+        if i == last:
+            i = j
+        if j < last:
+            paint(labels, blocks[j], j)
+
+        blocks[i] = block
+        paint(labels, block, i)
+        return BlockMatrix(blocks, self.n, self.m, labels, self.table, error)
+
+    def split(self, i, b1, b2):
+        # copy with block i replaced by b1 and b2
+        error = self.delta([self.blocks[i]], [b1, b2])
+        blocks = self.blocks.copy()
+        labels = self.labels.copy()
+
+        blocks[i] = b1
+        blocks.append(b2)
+        paint(labels, b2, len(blocks) - 1)
+        return BlockMatrix(blocks, self.n, self.m, labels, self.table, error)
 
     def __repr__(self):
-        return '\n'.join(' ' .join(str(self[i, j]) for j in range(self.m)) for i in range(self.n))
+        return '\n'.join(' '.join(map(str, row)) for row in self.values().tolist())
 
 
-def matrix_distance(matrix, block_matrix, n, m):
-    return 1 / (n * m) * sum((matrix[i][j] - block_matrix[i, j])**2 for j in range(m) for i in range(n))
+def paint(labels, block, index):
+    labels[block.start_row:block.start_row+block.height,
+           block.start_column:block.start_column+block.width] = index
 
 
 def change_value(block_matrix, k):
-    matrix_copy = block_matrix.copy()
-    block = random.choice(matrix_copy.blocks)
+    index = random.randrange(len(block_matrix.blocks))
+    block = block_matrix.blocks[index]
 
     i = VALUES.index(block.value)
     if i == len(VALUES)-1:
@@ -74,51 +169,56 @@ def change_value(block_matrix, k):
     else:
         new_i = i+random.choice([-1, 1])
 
-    block.value = VALUES[new_i]
-    return matrix_copy
+    return block_matrix.changed(index, VALUES[new_i])
 
 
 def merge_blocks(block_matrix, k):
-    for b1 in block_matrix.blocks:
-        for b2 in block_matrix.blocks:
-            if b1.start_column == b2.start_column and b1.width == b2.width:
-                start_row = min(b1.start_row, b2.start_row)
-                new_block = Block(start_row, b1.start_column,
+    # first block with a neighbour of the same height on its right or of
+    # the same width below it, found through the labels next to its edges
+    labels = block_matrix.labels
+    for i, b1 in enumerate(block_matrix.blocks):
+        below = b1.start_row + b1.height
+        if below < block_matrix.n:
+            j = labels[below, b1.start_column]
+            b2 = block_matrix.blocks[j] if j >= 0 else None
+            if b2 is not None and b2.start_column == b1.start_column and b2.width == b1.width:
+                new_block = Block(b1.start_row, b1.start_column,
                                   b1.width, b1.height+b2.height, b1.value)
-
-                return BlockMatrix(list(filter(lambda b: b != b1 and b != b2, block_matrix.blocks)) + [new_block], block_matrix.n, block_matrix.m)
-            elif b1.start_row == b2.start_row and b1.height == b2.height:
-                start_column = min(b1.start_column, b2.start_column)
-                new_block = Block(b1.start_row, start_column,
+                return block_matrix.merged(i, j, new_block)
+
+        right = b1.start_column + b1.width
+        if right < block_matrix.m:
+            j = labels[b1.start_row, right]
+            b2 = block_matrix.blocks[j] if j >= 0 else None
+            if b2 is not None and b2.start_row == b1.start_row and b2.height == b1.height:
+                new_block = Block(b1.start_row, b1.start_column,
                                   b1.width+b2.width, b1.height, b1.value)
-                return BlockMatrix(list(filter(lambda b: b != b1 and b != b2, block_matrix.blocks)) + [new_block], block_matrix.n, block_matrix.m)
+                return block_matrix.merged(i, j, new_block)
 
     return block_matrix
 
 
 def split_blocks(block_matrix, k):
-    matrix_copy = block_matrix.copy()
-
-    for b in block_matrix.blocks:
+    for i, b in enumerate(block_matrix.blocks):
         if b.width > 2*k:
             split_point = k + random.randrange(0, 2)
             b1 = Block(b.start_row, b.start_column,
                        split_point, b.height, b.value)
-            b2 = Block(b.start_row+split_point, b.start_column,
+            b2 = Block(b.start_row, b.start_column+split_point,
                        b.width-split_point, b.height, b.value)
 
-            return BlockMatrix(list(filter(lambda block: block != b, block_matrix.blocks)) + [b1, b2], block_matrix.n, block_matrix.m)
+            return block_matrix.split(i, b1, b2)
 
         elif b.height > 2*k:
             split_point = k + random.randrange(0, 2)
             b1 = Block(b.start_row, b.start_column,
                        b.width, split_point, b.value)
-            b2 = Block(b.start_row, b.start_column+split_point,
+            b2 = Block(b.start_row+split_point, b.start_column,
                        b.width, b.height-split_point, b.value)
 
-            return BlockMatrix(list(filter(lambda block: block != b, block_matrix.blocks)) + [b1, b2], block_matrix.n, block_matrix.m)
+            return block_matrix.split(i, b1, b2)
 
-    return matrix_copy
+    return block_matrix
 
 
 def merge_and_split(block_matrix, k):
@@ -126,12 +226,22 @@ def merge_and_split(block_matrix, k):
 
 
 def simulated_annealing(max_time, matrix, n, m, k):
-    def quality(solution): return matrix_distance(matrix, solution, n, m)
-    t = INIT_TEMP
+    # solutions carry their squared error, scored through summed-area tables
+    def quality(solution): return solution.error / (n * m)
 
-    s = BlockMatrix.get_initialized(n, m, k)
+    s = BlockMatrix.get_initialized(n, m, k, ErrorTable(matrix))
+    # with k past the image size no block fits and there is nothing to move
+    if not s.blocks:
+        return s, quality(s)
+
+    if CALIBRATE:
+        t = calibrate(s, lambda solution: change_value(solution, k), quality, CALIBRATION_SAMPLES)
+    else:
+        t = INIT_TEMP
+    schedule = get_schedule(COOLING, t, max_time, DECREASE_FACTOR)
     best = s
     quality_best = quality(best)
+    quality_s = quality_best
 
     start = time()
     while time() - start < max_time:
@@ -148,13 +258,12 @@ def simulated_annealing(max_time, matrix, n, m, k):
             r = r2
             quality_r = q_r2
 
-        quality_s = quality(s)
-
-        if quality_r <= quality_s or random.random() < exp((quality_s - quality_r) / t):
+        accepted = quality_r <= quality_s or random.random() < exp((quality_s - quality_r) / schedule.t)
+        if accepted:
             s = r
             quality_s = quality_r
 
-        t *= DECREASE_FACTOR
+        schedule.update(accepted)
 
         if quality_s < quality_best:
             best = s
@@ -165,7 +274,7 @@ def simulated_annealing(max_time, matrix, n, m, k):
 
 def main():
     time, n, m, k = list(map(int, input().split()))
-    matrix = [list(map(int, input().split())) for _ in range(n)]
+    matrix = np.array([list(map(int, input().split())) for _ in range(n)])
 
     result, quality = simulated_annealing(time, matrix, n, m, k)
     print(quality)
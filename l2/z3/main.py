@@ -1,90 +1,67 @@
-from enum import Enum
-from typing import List
-from sys import maxsize
-from random import random, choice, sample
+from random import random, sample
 from time import time
 from sys import stderr
-from math import exp
+from math import exp, ceil
+from pathlib import Path
+import sys
 
+import numpy as np
 
-INIT_TEMP = 100000
-DECREASE_FACTOR = 0.99
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.cooling import calibrate, get_schedule
+from common.maze import (Maze as MazeEngine, FitnessCache, PathEvaluator,
+                         format_path, read_maze)
 
 
-class Direction(Enum):
-    UP = (0, -1)
-    RIGHT = (1, 0)
-    DOWN = (0, 1)
-    LEFT = (-1, 0)
-
-
-class Maze:
-    EMPTY = 0
-    AGENT = 5
-    WALL = 1
-    GOAL = 8
-
-    def __init__(self, maze_map, max_steps):
-        self.map = maze_map
-        self.start_pos = self.find_agent()
-        self.max_steps = max_steps
-        self.n = len(maze_map)
-        self.m = len(maze_map[0])
-
-    def find_agent(self):
-        for i, _ in enumerate(self.map):
-            for j, el in enumerate(self.map[i]):
-                if el == self.AGENT:
-                    return (j, i)
-
-    def eval_path(self, path: List[Direction]):
-        cost = 0
-        x_pos, y_pos = self.start_pos
-
-        for direction in path:
-            cost += 1
-            if cost > self.max_steps:
-                return maxsize
-
-            x_move, y_move = direction.value
-            new_x = x_pos + x_move
-            new_y = y_pos + y_move
-
-            if self.map[new_y][new_x] == self.GOAL:
-                return cost
-
-            if self.map[new_y][new_x] != self.WALL:
-                x_pos, y_pos = new_x, new_y
-
-        return maxsize
-
-    def random_walk(self):
-        path = []
-        x, y = self.start_pos
-        direction = choice(list(Direction))
-        xmove, ymove = direction.value
-
-        while len(path) < self.n * self.m / 3:
-            if self.map[y+ymove][x+xmove] == 8:
-                path.append(direction)
-                return path, True
-            elif self.map[y+ymove][x+xmove] == 1:
-                direction = choice(list(Direction))
-                xmove, ymove = direction.value
-            else:
-                x += xmove
-                y += ymove
-                path.append(direction)
-                if random() < 0.15:
-                    direction = choice(list(Direction))
-                    xmove, ymove = direction.value
-
-        return path, False
+INIT_TEMP = 100000
+DECREASE_FACTOR = 0.99
+COOLING = 'reheating'
+CALIBRATE = True
+WALKERS = 256
+SEED_TIME_LIMIT = 0.5
+# report fitness cache hits and misses on stderr, ahead of the path
+CACHE_STATS = False
+
+
+class Maze(MazeEngine):
+    def random_walks(self, walkers=WALKERS, time_limit=SEED_TIME_LIMIT):
+        # many random walks stepped together; a walker keeps its direction
+        # until it hits a wall or turns at random, and restarts once its
+        # path reaches a third of the maze size
+        table = self.transition_array()[:, :4]
+        goal = len(table) - 1
+        limit = self.n * self.m / 3
+
+        moves = np.zeros((walkers, ceil(limit) + 1), dtype=np.uint8)
+        cells = np.full(walkers, self.start)
+        lengths = np.zeros(walkers, dtype=np.int64)
+        directions = np.random.randint(0, 4, walkers)
+
+        deadline = time() + time_limit
+        while time() < deadline:
+            targets = table[cells, directions]
+            moving = targets != cells
+            moves[moving, lengths[moving]] = directions[moving]
+            lengths += moving
+
+            found = np.flatnonzero(targets == goal)
+            if len(found):
+                return bytearray(moves[found[0], :lengths[found[0]]])
+
+            cells = np.where(moving, targets, cells)
+            turning = ~moving | (np.random.random(walkers) < 0.15)
+            directions[turning] = np.random.randint(0, 4, turning.sum())
+
+            restarting = lengths >= limit
+            cells[restarting] = self.start
+            lengths[restarting] = 0
+
+        return None
 
     def generate_naive_path(self):
-        found = False
-        while not found:
-            path, found = self.random_walk()
+        path = self.random_walks()
+        if path is None:
+            path = self.shortest_path()
 
         return path
 
@@ -94,46 +71,53 @@ def tweak(path):
     i, j = sample(range(len(path)), 2)
     copy[i], copy[j] = copy[j], copy[i]
 
-    return copy
+    return copy, min(i, j)
 
 
 def simulated_annealing(maze, max_time):
-    t = INIT_TEMP
-
     s = maze.generate_naive_path()
+    cache = FitnessCache()
+    evaluator = PathEvaluator(maze, s, cache)
     best = s
-    quality_best = maze.eval_path(best)
+    quality_best = evaluator.cost
+    bound = maze.shortest_distance()
+
+    # a seed at the bound needs no annealing, and tweak needs two moves
+    if quality_best <= bound or len(s) < 2:
+        return best
+
+    t = calibrate(s, lambda path: tweak(path)[0], maze.bounded_cost) if CALIBRATE else INIT_TEMP
+    schedule = get_schedule(COOLING, t, max_time, DECREASE_FACTOR)
 
     start = time()
-    while time() - start < max_time:
-        r = tweak(s)
-        quality_s = maze.eval_path(s)
-        quality_r = maze.eval_path(r)
+    while time() - start < max_time and quality_best > bound:
+        r, index = tweak(s)
+        quality_s = evaluator.cost
+        quality_r = evaluator.evaluate(r, index)
 
-        if quality_r < quality_s or random() < exp((quality_s - quality_r) / t):
+        accepted = quality_r < quality_s or random() < exp((quality_s - quality_r) / schedule.t)
+        if accepted:
             s = r
+            evaluator = evaluator.derive(r, index)
             quality_s = quality_r
 
-        t *= DECREASE_FACTOR
+        schedule.update(accepted)
 
         if quality_s < quality_best:
             best = s
             quality_best = quality_s
 
+    if CACHE_STATS:
+        print(cache, file=stderr)
     return best
 
 
 if __name__ == "__main__":
-    max_time, n, m = [int(word) for word in input().split()]
-
-    maze_map = [[int(char) for char in input()[:m]] for _ in range(n)]
+    (max_time, n, m), maze_map, _ = read_maze()
 
     maze = Maze(maze_map, n*m)
 
     best = simulated_annealing(maze, max_time)
 
-    move_names = {Direction.UP: 'U', Direction.DOWN: 'D',
-                  Direction.RIGHT: 'R', Direction.LEFT: 'L'}
-
     print(maze.eval_path(best))
-    print(''.join(move_names[move] for move in best), file=stderr)
+    print(format_path(best), file=stderr)
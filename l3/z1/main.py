@@ -1,16 +1,19 @@
 import random
 import time
 import math
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common import benchmarks
 
 POPSIZE = 10
 T_SIZE = 4
 NOISE = 0.1
 
 
-def yang(x, eps):
-    return sum(epsi * abs(xi)**i for i, (xi, epsi) in enumerate(zip(x, eps), 1))
-
-
 def crossover(parent_a, parent_b):
     v = parent_a.copy()
     w = parent_b.copy()
@@ -57,11 +60,8 @@ def genetic_algorithm(max_time, x, assess_fitness):
     start = time.time()
 
     while time.time() - start < max_time:
-        fitnesses = []
-        for individual in population:
-            fitness = assess_fitness(individual)
-            fitnesses.append(fitness)
-
+        fitnesses = assess_fitness(np.array(population)).tolist()
+        for individual, fitness in zip(population, fitnesses):
             if best is None or fitness < best_fitness:
                 best = individual
                 best_fitness = fitness
@@ -91,7 +91,8 @@ def main():
     x = list(map(float, inputs[1:6]))
     eps = list(map(float, inputs[6:11]))
 
-    best, fitness = genetic_algorithm(t, x, lambda x: yang(x, eps))
+    best, fitness = genetic_algorithm(
+        t, x, lambda population: benchmarks.yang(population, eps))
 
     print(*best, fitness)
 
@@ -1,60 +1,73 @@
-from enum import Enum
-from typing import List
-from sys import maxsize
 import random
 import time
 from sys import stderr
 import math
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count
+from pathlib import Path
+import sys
 
-T_SIZE = 4
-
-
-class Direction(Enum):
-    UP = (0, -1)
-    RIGHT = (1, 0)
-    DOWN = (0, 1)
-    LEFT = (-1, 0)
-
-
-class Maze:
-    EMPTY = 0
-    AGENT = 5
-    WALL = 1
-    GOAL = 8
-
-    def __init__(self, maze_map, max_steps):
-        self.map = maze_map
-        self.start_pos = self.find_agent()
-        self.max_steps = max_steps
-        self.n = len(maze_map)
-        self.m = len(maze_map[0])
+import numpy as np
 
-    def find_agent(self):
-        for i, _ in enumerate(self.map):
-            for j, el in enumerate(self.map[i]):
-                if el == self.AGENT:
-                    return (j, i)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.maze import (Maze, FitnessCache, PathEvaluator, eval_population,
+                         format_path, read_maze)
 
-    def eval_path(self, path: List[Direction]):
-        cost = 0
-        x_pos, y_pos = self.start_pos
-
-        for direction in path:
-            cost += 1
-            if cost > self.max_steps:
-                return maxsize
-
-            x_move, y_move = direction.value
-            new_x = x_pos + x_move
-            new_y = y_pos + y_move
-
-            if self.map[new_y][new_x] == self.GOAL:
-                return cost
-
-            if self.map[new_y][new_x] != self.WALL:
-                x_pos, y_pos = new_x, new_y
-
-        return maxsize
+T_SIZE = 4
+# from this population size on, generations are scored in one batch
+BATCH_POPSIZE = 100
+# and from this one on, the batch is split across a worker pool
+PARALLEL_POPSIZE = 2000
+WORKERS = cpu_count()
+CHUNKS_PER_WORKER = 4
+# report fitness cache hits and misses on stderr, ahead of the path
+CACHE_STATS = False
+
+
+class FitnessPool:
+    # workers score generations against the maze's transition table, which
+    # is published once in shared memory; each generation is sent as a few
+    # chunks of joined path bytes with the path lengths
+    def __init__(self, maze, workers):
+        table = maze.transition_array()
+        self.memory = SharedMemory(create=True, size=table.nbytes)
+        shared = np.ndarray(table.shape, dtype=table.dtype, buffer=self.memory.buf)
+        shared[:] = table
+
+        self.chunks = workers * CHUNKS_PER_WORKER
+        self.pool = Pool(workers, initializer=init_fitness_worker,
+                         initargs=(self.memory.name, table.shape, table.dtype.str,
+                                   maze.start, maze.max_steps))
+
+    def eval_population(self, paths):
+        bounds = np.linspace(0, len(paths), self.chunks + 1).astype(int)
+        costs = self.pool.starmap(score_chunk, (
+            (b''.join(paths[lo:hi]), [len(path) for path in paths[lo:hi]])
+            for lo, hi in zip(bounds, bounds[1:]) if lo < hi))
+        return [cost for chunk in costs for cost in chunk]
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.memory.close()
+        self.memory.unlink()
+
+
+def init_fitness_worker(name, shape, dtype, start, max_steps):
+    global fitness_memory, fitness_table, fitness_start, fitness_max_steps
+    fitness_memory = SharedMemory(name=name)
+    fitness_table = np.ndarray(shape, dtype=dtype, buffer=fitness_memory.buf)
+    fitness_start = start
+    fitness_max_steps = max_steps
+
+
+def score_chunk(data, lengths):
+    offsets = [0]
+    for length in lengths:
+        offsets.append(offsets[-1] + length)
+    paths = [data[a:b] for a, b in zip(offsets, offsets[1:])]
+    return eval_population(fitness_table, fitness_start, fitness_max_steps, paths)
 
 
 def crossover(parent_a, parent_b):
@@ -73,14 +86,14 @@ def crossover(parent_a, parent_b):
         for i in range(c, d):
             v[i], w[i] = w[i], v[i]
 
-    return v, w
+    return v, w, c
 
 
 def mutate(individual):
     i = random.randrange(len(individual))
     j = random.randrange(len(individual))
     individual[i], individual[j] = individual[j], individual[i]
-    return individual
+    return individual, min(i, j)
 
 
 def tournament_selection(fitnesses):
@@ -96,58 +109,74 @@ def tournament_selection(fitnesses):
     return best
 
 
-def genetic_algorithm(max_time, maze, popsize, initial_population):
-    population = initial_population
+def genetic_algorithm(max_time, maze, popsize, initial_population, workers=WORKERS):
+    # individuals are kept with their checkpoints, so children are only
+    # simulated from the first position where they differ from a parent
+    cache = FitnessCache()
+    population = [PathEvaluator(maze, individual, cache)
+                  for individual in initial_population]
 
     best = None
     best_fitness = 100000
 
-    start = time.time()
-
-    while time.time() - start < max_time:
-        fitnesses = []
-        for individual in population:
-            fitness = maze.eval_path(individual)
-            fitnesses.append(fitness)
-
-            if best is None or fitness < best_fitness:
-                best = individual
-                best_fitness = fitness
-                last_best = time.time()
-
-        q = []
-
-        for _ in range(popsize//2):
-            parent_a = population[tournament_selection(fitnesses)]
-            parent_b = population[tournament_selection(fitnesses)]
-
-            child_a, child_b = crossover(parent_a, parent_b)
+    fitness_pool = None
+    scorer = maze
+    if workers > 1 and popsize >= PARALLEL_POPSIZE:
+        fitness_pool = FitnessPool(maze, workers)
+        scorer = fitness_pool
 
-            q += [mutate(child_a), mutate(child_b)]
-
-        population = q
-
-        if time.time() - last_best > math.log(max_time):
-            break
+    start = time.time()
 
+    try:
+        while time.time() - start < max_time:
+            fitnesses = []
+            for individual in population:
+                fitness = individual.cost
+                fitnesses.append(fitness)
+
+                if best is None or fitness < best_fitness:
+                    best = individual.path
+                    best_fitness = fitness
+                    last_best = time.time()
+
+            q = []
+
+            for _ in range(popsize//2):
+                parent_a = population[tournament_selection(fitnesses)]
+                parent_b = population[tournament_selection(fitnesses)]
+
+                child_a, child_b, c = crossover(parent_a.path, parent_b.path)
+                child_a, i = mutate(child_a)
+                child_b, j = mutate(child_b)
+
+                q += [(parent_a, child_a, min(c, i)), (parent_b, child_b, min(c, j))]
+
+            if popsize >= BATCH_POPSIZE:
+                costs = scorer.eval_population([child for _, child, _ in q])
+                population = [PathEvaluator(maze, child, cost=cost)
+                              for (_, child, _), cost in zip(q, costs)]
+            else:
+                population = [parent.derive(child, index)
+                              for parent, child, index in q]
+
+            if time.time() - last_best > math.log(max_time):
+                break
+    finally:
+        if fitness_pool is not None:
+            fitness_pool.close()
+
+    if CACHE_STATS:
+        print(cache, file=stderr)
     return best, best_fitness
 
 
 if __name__ == "__main__":
-    max_time, n, m, s, p = [int(word) for word in input().split()]
-
-    maze_map = [[int(char) for char in input()[:m]] for _ in range(n)]
-
-    moves = {'U': Direction.UP, 'D': Direction.DOWN,
-             'R': Direction.RIGHT, 'L': Direction.LEFT}
-    solutions = [[moves[char] for char in input().strip()] for _ in range(s)]
+    (max_time, n, m, s, p), maze_map, solutions = read_maze()
+    solutions = solutions[:s]
 
     maze = Maze(maze_map, n*m)
 
     best, fitness = genetic_algorithm(max_time, maze, p, solutions)
 
-    move_names = {Direction.UP: 'U', Direction.DOWN: 'D',
-                  Direction.RIGHT: 'R', Direction.LEFT: 'L'}
-
     print(maze.eval_path(best))
-    print(''.join(move_names[move] for move in best), file=stderr)
+    print(format_path(best), file=stderr)
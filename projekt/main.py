@@ -1,77 +1,37 @@
-from enum import Enum
-from typing import List
 from sys import maxsize
 import random
 from time import time
 from sys import stderr
 import math
+from multiprocessing import Pool
+from os import cpu_count
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.maze import Maze, FitnessCache, PathEvaluator, format_path, read_maze
+from common.rope import Rope
+from common.cooling import calibrate, get_schedule
 
 INIT_TEMP = 1000
 DECREASE_FACTOR = 0.9
-
-
-class Direction(Enum):
-    UP = (0, -1)
-    RIGHT = (1, 0)
-    DOWN = (0, 1)
-    LEFT = (-1, 0)
-
-
-MOVE_NAMES = {Direction.UP: 'U', Direction.DOWN: 'D',
-              Direction.RIGHT: 'R', Direction.LEFT: 'L'}
-
-
-class Maze:
-    EMPTY = 0
-    AGENT = 5
-    WALL = 1
-    GOAL = 8
-    HORIZONTAL_TUNNEL = 3
-    VERTICAL_TUNNEL = 2
-
-    def __init__(self, maze_map, max_steps):
-        self.map = maze_map
-        self.start_pos = self.find_agent()
-        self.max_steps = max_steps
-        self.n = len(maze_map)
-        self.m = len(maze_map[0])
-
-    def find_agent(self):
-        for i, _ in enumerate(self.map):
-            for j, el in enumerate(self.map[i]):
-                if el == self.AGENT:
-                    return (j, i)
-
-    def eval_path(self, path: List[Direction]):
-        cost = 0
-        x_pos, y_pos = self.start_pos
-
-        for direction in path:
-            cost += 1
-
-            if self.map[y_pos][x_pos] == self.HORIZONTAL_TUNNEL and direction in (Direction.UP, Direction.DOWN):
-                continue
-
-            if self.map[y_pos][x_pos] == self.VERTICAL_TUNNEL and direction in (Direction.LEFT, Direction.RIGHT):
-                continue
-
-            x_move, y_move = direction.value
-            new_x = x_pos + x_move
-            new_y = y_pos + y_move
-
-            if self.map[new_y][new_x] == self.GOAL:
-                return cost
-
-            if self.map[new_y][new_x] == self.HORIZONTAL_TUNNEL and direction in (Direction.UP, Direction.DOWN):
-                pass
-            elif self.map[new_y][new_x] == self.VERTICAL_TUNNEL and direction in (Direction.LEFT, Direction.RIGHT):
-                pass
-            elif self.map[new_y][new_x] == self.WALL:
-                pass
-            else:
-                x_pos, y_pos = new_x, new_y
-
-        return maxsize
+COOLING = 'time'
+CALIBRATE = True
+PARALLEL_TEMPERING = True
+WORKERS = cpu_count()
+REPLICAS = max(2, WORKERS)
+MAX_TEMP = 10
+MIN_TEMP = 0.1
+EPOCH_STEPS = 2000
+COOLING_TIME = 2
+# report fitness cache hits and misses on stderr, ahead of the path
+CACHE_STATS = False
+# below this many moves copying a bytearray beats the rope's O(log L) edits
+# (measured break-even is between 300k and 500k moves)
+ROPE_MIN_LENGTH = 1 << 19
+
+# random bytes to uniform direction codes
+RANDOM_CODES = bytes(range(4)) * 64
 
 
 def tweak(path):
@@ -79,56 +39,148 @@ def tweak(path):
     j = random.randrange(i, len(path))
 
     if random.random() < 0.8:
-        return path[:i+1] + path[j:i:-1] + path[j+1:]
+        if isinstance(path, Rope):
+            return path.reverse(i+1, j+1), i+1
+        return path[:i+1] + path[j:i:-1] + path[j+1:], i+1
     else:
-        return path[:i+1] + [random.choice(list(Direction)) for _ in range(j-i)] + path[j+1:]
-
+        codes = random.randbytes(j-i).translate(RANDOM_CODES)
+        if isinstance(path, Rope):
+            return path.replace(i+1, j+1, codes), i+1
+        return path[:i+1] + codes + path[j+1:], i+1
 
 
 def simulated_annealing(max_time, maze, init_solution):
-    t = INIT_TEMP
-
     s = init_solution
+    t = calibrate(s, lambda path: tweak(path)[0], maze.bounded_cost) if CALIBRATE else INIT_TEMP
+    # cool over a window growing with the maze rather than the whole budget
+    cooling_time = min(max_time, COOLING_TIME * math.log(maze.n*maze.m))
+    schedule = get_schedule(COOLING, t, cooling_time, DECREASE_FACTOR)
+    cache = FitnessCache()
+    evaluator = PathEvaluator(maze, s, cache)
     best = s
-    quality_best = maze.eval_path(best)
+    quality_best = evaluator.cost
 
     start = time()
     last_best = time()
-    while time() - start < max_time and t > 0:
+    while time() - start < max_time and schedule.t > 0:
         # print(t)
-        r = tweak(s)
-        quality_s = maze.eval_path(s)
-        quality_r = maze.eval_path(r)
+        r, index = tweak(s)
+        quality_s = evaluator.cost
+        quality_r = evaluator.evaluate(r, index)
 
-        if quality_r < quality_s or random.random() < math.exp((quality_s - quality_r) / t):
+        accepted = quality_r < quality_s or random.random() < math.exp((quality_s - quality_r) / schedule.t)
+        if accepted:
             s = r
+            evaluator = evaluator.derive(r, index)
             quality_s = quality_r
 
-        t *= DECREASE_FACTOR
+        schedule.update(accepted)
 
         if quality_s < quality_best:
             best = s
             quality_best = quality_s
             last_best = time()
-        if time() - last_best > min(0.5*math.log(max_time), 0.5*math.log(maze.n*maze.m/10)):
+        # give up on idling only once the schedule has cooled off
+        if schedule.elapsed() >= 1 and \
+                time() - last_best > min(0.5*math.log(max_time), 0.5*math.log(maze.n*maze.m/10)):
             break
 
+    if CACHE_STATS:
+        print(cache, file=stderr)
     return best, quality_best
 
 
-if __name__ == "__main__":
-    max_time, n, m = [int(word) for word in input().split()]
+def init_replica(maze):
+    global replica_maze, replica_cache
+    replica_maze = maze
+    replica_cache = FitnessCache()
+
+
+def run_replica(s, t, deadline, seed):
+    # metropolis chain at a fixed temperature for one epoch
+    random.seed(seed)
+    hits, misses = replica_cache.hits, replica_cache.misses
+    evaluator = PathEvaluator(replica_maze, s, replica_cache)
+    quality_s = evaluator.cost
+    best = s
+    quality_best = quality_s
 
-    maze_map = [[int(char) for char in input()[:m]] for _ in range(n)]
+    for _ in range(EPOCH_STEPS):
+        if time() > deadline:
+            break
+
+        r, index = tweak(s)
+        quality_r = evaluator.evaluate(r, index)
 
-    moves = {'U': Direction.UP, 'D': Direction.DOWN,
-             'R': Direction.RIGHT, 'L': Direction.LEFT}
+        if quality_r < quality_s or random.random() < math.exp((quality_s - quality_r) / t):
+            s = r
+            evaluator = evaluator.derive(r, index)
+            quality_s = quality_r
 
-    init_solution = [moves[c] for c in input().strip()]
+            if quality_s < quality_best:
+                best = s
+                quality_best = quality_s
 
-    maze = Maze(maze_map, n*m)
+    return (s, quality_s, best, quality_best,
+            replica_cache.hits - hits, replica_cache.misses - misses)
 
-    best, cost = simulated_annealing(max_time, maze, init_solution)
+
+def parallel_tempering(max_time, maze, init_solution, replicas=REPLICAS, workers=WORKERS):
+    # replicas at fixed temperatures from the top one down to MIN_TEMP run in
+    # the pool for an epoch, then neighbouring temperatures may swap states
+    if CALIBRATE:
+        max_temp = max(MIN_TEMP, calibrate(init_solution, lambda path: tweak(path)[0], maze.bounded_cost))
+    else:
+        max_temp = MAX_TEMP
+    temperatures = [max_temp * (MIN_TEMP / max_temp) ** (k / (replicas - 1))
+                    for k in range(replicas)]
+    quality = maze.eval_path(init_solution)
+    states = [(init_solution, quality)] * replicas
+    best = init_solution
+    quality_best = quality
+    bound = maze.shortest_distance()
+
+    deadline = time() + max_time
+    epoch = 0
+    hits = misses = 0
+    with Pool(workers, initializer=init_replica, initargs=(maze,)) as pool:
+        while time() < deadline and quality_best > bound:
+            results = pool.starmap(run_replica, (
+                (s, t, deadline, random.getrandbits(32))
+                for (s, _), t in zip(states, temperatures)))
+
+            states = []
+            for s, quality_s, replica_best, quality_replica, replica_hits, replica_misses in results:
+                states.append((s, quality_s))
+                hits += replica_hits
+                misses += replica_misses
+                if quality_replica < quality_best:
+                    best = replica_best
+                    quality_best = quality_replica
+
+            for k in range(epoch % 2, replicas - 1, 2):
+                (_, quality_hot), (_, quality_cold) = states[k], states[k+1]
+                delta = (1 / temperatures[k] - 1 / temperatures[k+1]) * (quality_hot - quality_cold)
+                if delta >= 0 or random.random() < math.exp(delta):
+                    states[k], states[k+1] = states[k+1], states[k]
+            epoch += 1
+
+    if CACHE_STATS:
+        print(f'replica caches: hits={hits}, misses={misses}', file=stderr)
+    return best, quality_best
+
+
+if __name__ == "__main__":
+    (max_time, n, m), maze_map, (init_solution, *_) = read_maze()
+    if len(init_solution) >= ROPE_MIN_LENGTH:
+        init_solution = Rope(init_solution)
+
+    maze = Maze(maze_map, maxsize)
+
+    if PARALLEL_TEMPERING:
+        best, cost = parallel_tempering(max_time, maze, init_solution)
+    else:
+        best, cost = simulated_annealing(max_time, maze, init_solution)
 
     print(cost)
-    print(''.join(MOVE_NAMES[move] for move in best[:cost]), file=stderr)
+    print(format_path(best[:cost]), file=stderr)